@@ -3,14 +3,17 @@ Tests for basic TGN object operations.
 """
 # pylint: disable=redefined-outer-name
 import logging
+import time
 import typing
+from logging.handlers import MemoryHandler
+from pathlib import Path
 from typing import Dict, Iterable, List, Type
 
 import pytest
 
 from trafficgenerator import ApiType, TgnApp, TgnError
 from trafficgenerator.tgn_object import TgnObject, TgnObjectsDict, TgnSubStatsDict
-from trafficgenerator.tgn_utils import flatten, is_false, is_ip, is_local_host, is_true
+from trafficgenerator.tgn_utils import flatten, is_false, is_ip, is_local_host, is_true, new_log_file, poll
 
 
 class TgnTestObject(TgnObject):
@@ -96,6 +99,15 @@ def test_objects_tree(tgn_object: TgnTestObject) -> None:
     assert tgn_object.get_child() == tgn_object.leaf1
 
 
+@typing.no_type_check
+def test_obj_id(tgn_object: TgnTestObject) -> None:
+    """Test object ID parsing from index."""
+    tgn_object.node1._set_data(index="1/2")  # pylint: disable=protected-access
+    assert tgn_object.node1.id == 2
+    tgn_object.node1._set_data(index="1/3")  # pylint: disable=protected-access
+    assert tgn_object.node1.id == 3
+
+
 @typing.no_type_check
 def test_objects_dict(tgn_object: TgnTestObject) -> None:
     """Test TgnObjectsDict class."""
@@ -175,3 +187,29 @@ def test_flatten() -> None:
     assert len(flatten(ml_list)) == 5
     assert isinstance(flatten(ml_list)[1], int)
     assert isinstance(flatten(ml_list)[2], int)
+    assert flatten(["a", ("bc", ["d"])]) == ["a", "bc", "d"]
+    assert flatten(1) == [1]  # type: ignore[arg-type]
+
+
+def test_poll() -> None:
+    """Test poll utility."""
+    assert len(list(poll(0))) == 1
+    start = time.monotonic()
+    assert len(list(poll(0.5))) > 1
+    assert time.monotonic() - start < 1
+
+
+def test_new_log_file(tmp_path: Path) -> None:
+    """Test new log file creation."""
+    logger = logging.getLogger("test_new_log_file")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.FileHandler(tmp_path.joinpath("test.txt")))
+    new_logger = new_log_file(logger, "suffix")
+    assert new_log_file(logger, "suffix") == new_logger
+    assert len(new_logger.handlers) == 1
+    target = typing.cast(MemoryHandler, new_logger.handlers[0]).target
+    assert typing.cast(logging.FileHandler, target).baseFilename == tmp_path.joinpath("test-suffix.tcl").as_posix()
+    new_logger.info("command")
+    assert not tmp_path.joinpath("test-suffix.tcl").read_text()
+    new_logger.handlers[0].flush()
+    assert tmp_path.joinpath("test-suffix.tcl").read_text() == "command\n"
@@ -2,16 +2,18 @@
 Test server module.
 """
 # pylint: disable=redefined-outer-name
+import threading
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Iterable
+from types import SimpleNamespace
+from typing import ContextManager, Iterable, List, Optional, Tuple
 
 import pytest
 from invoke.exceptions import UnexpectedExit
 
 from tests import TgnTestSutUtils
-from trafficgenerator.tgn_server import Server
-
-pytestmark = pytest.mark.vmware
+from trafficgenerator import tgn_server
+from trafficgenerator.tgn_server import Server, reboot_servers
 
 
 @pytest.fixture
@@ -24,6 +26,7 @@ def server(sut_utils: TgnTestSutUtils, vmware: TgnTestSutUtils) -> Iterable[Serv
     sut_utils.server().power_on()
 
 
+@pytest.mark.vmware
 def test_exec_cmd(server: Server) -> None:
     """Test commands that fail."""
     out = server.exec_cmd("pwd")
@@ -33,6 +36,7 @@ def test_exec_cmd(server: Server) -> None:
         server.exec_cmd("invalid_command")
 
 
+@pytest.mark.vmware
 def test_put(server: Server) -> None:
     """Test Server put."""
     local_path = Path(__file__)
@@ -41,6 +45,7 @@ def test_put(server: Server) -> None:
     assert local_path.name in ls.stdout
 
 
+@pytest.mark.vmware
 def test_reboot(server: Server) -> None:
     """Test reboot."""
     assert server.is_up()
@@ -48,6 +53,7 @@ def test_reboot(server: Server) -> None:
     assert server.is_up()
 
 
+@pytest.mark.vmware
 def test_power(server: Server) -> None:
     """Test VM power operations."""
     assert server.is_up()
@@ -60,6 +66,7 @@ def test_power(server: Server) -> None:
     assert server.is_up()
 
 
+@pytest.mark.vmware
 def test_negative(server: Server) -> None:
     """Negative tests."""
     with pytest.raises(UnexpectedExit):
@@ -76,3 +83,106 @@ def test_negative(server: Server) -> None:
         server.shutdown()
     with pytest.raises(ValueError):
         server.power_on()
+
+
+@pytest.fixture
+def probes(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    """Replace SSH port probes with fake probes, hosts named "down" are down, and yield the list of probed hosts."""
+    probed_hosts: List[str] = []
+    lock = threading.Lock()
+
+    def create_connection(address: Tuple[str, int], **_: float) -> ContextManager[None]:
+        with lock:
+            probed_hosts.append(address[0])
+        if address[0] == "down":
+            raise OSError()
+        return nullcontext()
+
+    monkeypatch.setattr(tgn_server.socket, "create_connection", create_connection)
+    return probed_hosts
+
+
+def test_is_up_ttl(monkeypatch: pytest.MonkeyPatch, probes: List[str]) -> None:
+    """Test is_up reuses the last probe result for IS_UP_TTL seconds."""
+    server = Server("up", "up", "user", "password")
+    assert server.is_up()
+    assert server.is_up()
+    assert probes == ["up"]
+    assert server.is_up(force=True)
+    assert probes == ["up", "up"]
+    monkeypatch.setattr(Server, "IS_UP_TTL", 0)
+    assert server.is_up()
+    assert probes == ["up", "up", "up"]
+    assert not Server("down", "down", "user", "password").is_up()
+
+
+def test_batch_is_up(probes: List[str]) -> None:
+    """Test batch_is_up probes all servers."""
+    up = Server("up", "up", "user", "password")
+    down = Server("down", "down", "user", "password")
+    assert Server.batch_is_up([up, down]) == {up: True, down: False}
+    assert sorted(probes) == ["down", "up"]
+    assert not Server.batch_is_up([])
+
+
+def test_reboot_servers(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test reboot_servers reboots all servers and raises server errors."""
+    rebooted: List[Tuple[str, bool, Optional[int]]] = []
+
+    def reboot(server: Server, wait: bool = True, timeout: Optional[int] = 60) -> None:
+        rebooted.append((server.name, wait, timeout))
+        if server.name == "bad":
+            raise TimeoutError()
+
+    monkeypatch.setattr(Server, "reboot", reboot)
+    servers = [Server(name, name, "user", "password") for name in ["a", "b"]]
+    reboot_servers(servers, wait=False, timeout=10)
+    assert sorted(rebooted) == [("a", False, 10), ("b", False, 10)]
+    with pytest.raises(TimeoutError):
+        reboot_servers(servers + [Server("bad", "bad", "user", "password")])
+    reboot_servers([])
+
+
+class FakeConnection:
+    """Mock fabric Connection that replies to all commands with the same output."""
+
+    stdout = ""
+
+    def __init__(self, *_: object, **__: object) -> None:
+        """Ignore connection parameters."""
+
+    def __enter__(self) -> "FakeConnection":
+        """Return self."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Do nothing."""
+
+    def run(self, *_: object, **__: object) -> SimpleNamespace:
+        """Return the fixed output."""
+        return SimpleNamespace(stdout=self.stdout)
+
+
+@pytest.mark.parametrize(
+    "up_time, rebooted",
+    [
+        ("up", True),
+        ("up 0 minutes", True),
+        ("up 3 minutes", True),
+        ("up 42 minutes", False),
+        ("up 1 hour, 3 minutes", False),
+        ("up 2 weeks", False),
+        ("up 1 day, 2 hours, 5 minutes", False),
+    ],
+)
+def test_wait_reboot(monkeypatch: pytest.MonkeyPatch, up_time: str, rebooted: bool) -> None:
+    """Test wait_reboot treats only uptimes shorter than the timeout as rebooted."""
+    monkeypatch.setattr(FakeConnection, "stdout", up_time + "\n")
+    monkeypatch.setattr(tgn_server, "Connection", FakeConnection)
+    monkeypatch.setattr(tgn_server, "poll", lambda *_: iter(range(3)))
+    server = Server("server", "server", "user", "password")
+    if rebooted:
+        server.wait_reboot(timeout=600)
+    else:
+        with pytest.raises(TimeoutError):
+            server.wait_reboot(timeout=600)
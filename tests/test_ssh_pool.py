@@ -0,0 +1,168 @@
+"""
+Tests for the SSH connections pool.
+"""
+# pylint: disable=redefined-outer-name
+from io import BytesIO
+from typing import IO, Iterable, List, Optional, Tuple, Union
+
+import pytest
+
+from trafficgenerator import tgn_server, tgn_ssh_pool
+
+
+class FakeTransport:
+    """Mock paramiko transport."""
+
+    def __init__(self) -> None:
+        """Create active transport."""
+        self.active = True
+        self.keepalive = 0
+
+    def is_active(self) -> bool:
+        """Return transport state."""
+        return self.active
+
+    def set_keepalive(self, interval: int) -> None:
+        """Record keepalive interval."""
+        self.keepalive = interval
+
+
+class FakeConnection:
+    """Mock fabric Connection."""
+
+    opened: List["FakeConnection"] = []
+
+    def __init__(self, host: str, user: str, connect_kwargs: dict) -> None:
+        """Record connection parameters."""
+        self.host = host
+        self.user = user
+        self.connect_kwargs = connect_kwargs
+        self.transport: Optional[FakeTransport] = None
+        self.closed = False
+        self.put_error: Optional[Exception] = None
+        self.uploaded: List[Tuple[Union[str, bytes], str]] = []
+
+    def open(self) -> None:  # noqa: A003
+        """Open connection."""
+        self.transport = FakeTransport()
+        FakeConnection.opened.append(self)
+
+    def put(self, local: Union[str, IO], remote: str) -> None:
+        """Record uploaded content, or raise put_error, simulating a transport failure if the transport is not active."""
+        if self.put_error:
+            raise self.put_error
+        self.uploaded.append((local if isinstance(local, str) else local.read(), remote))
+
+    def close(self) -> None:
+        """Close connection."""
+        self.closed = True
+        if self.transport:
+            self.transport.active = False
+
+
+@pytest.fixture(autouse=True)
+def fake_connection(monkeypatch: pytest.MonkeyPatch) -> Iterable[None]:
+    """Replace fabric Connection with FakeConnection and clear the pool after each test."""
+    monkeypatch.setattr(tgn_ssh_pool, "Connection", FakeConnection)
+    FakeConnection.opened = []
+    yield
+    tgn_ssh_pool.close_all()
+
+
+def test_acquire() -> None:
+    """Test connections are shared per (host, user, password)."""
+    connection = tgn_ssh_pool.acquire("host", "user", "password", keepalive_interval=10)
+    assert connection.connect_kwargs == {"password": "password"}
+    assert connection.transport.keepalive == 10
+    assert tgn_ssh_pool.acquire("host", "user", "password") is connection
+    assert tgn_ssh_pool.connect("host", "user", "password") is connection
+    assert tgn_ssh_pool.get("host", "user", "password") is connection
+    assert tgn_ssh_pool.acquire("host", "other_user", "password") is not connection
+    assert tgn_ssh_pool.acquire("other_host", "user", "password") is not connection
+    assert tgn_ssh_pool.acquire("host", "user", "other_password") is not connection
+    assert tgn_ssh_pool.get("host", "user", "wrong_password") is None
+    assert len(FakeConnection.opened) == 4
+    assert all("password" not in key for key in tgn_ssh_pool._connections)  # pylint: disable=protected-access
+
+
+def test_acquire_stale() -> None:
+    """Test acquire and connect replace connection with inactive transport."""
+    connection = tgn_ssh_pool.acquire("host", "user", "password")
+    connection.transport.active = False
+    assert tgn_ssh_pool.get("host", "user", "password") is None
+    new_connection = tgn_ssh_pool.connect("host", "user", "password")
+    assert new_connection is not connection
+    assert connection.closed
+    assert tgn_ssh_pool.get("host", "user", "password") is new_connection
+
+
+def test_release() -> None:
+    """Test the connection is closed only when the last reference is released."""
+    connection = tgn_ssh_pool.acquire("host", "user", "password")
+    tgn_ssh_pool.acquire("host", "user", "password")
+    tgn_ssh_pool.release("host", "user", "password")
+    assert not connection.closed
+    assert tgn_ssh_pool.get("host", "user", "password") is connection
+    tgn_ssh_pool.release("host", "user", "password")
+    assert connection.closed
+    assert tgn_ssh_pool.get("host", "user", "password") is None
+    tgn_ssh_pool.release("host", "user", "password")
+    new_connection = tgn_ssh_pool.acquire("host", "user", "password")
+    tgn_ssh_pool.release("host", "user", "password")
+    assert new_connection.closed
+
+
+def test_shell_close() -> None:
+    """Test closing a shell does not close the connection used by other shells to the same host."""
+    shell = tgn_server.SshShell("host", "user", "password")
+    other_shell = tgn_server.SshShell("host", "user", "password")
+    connection = shell._connection()  # pylint: disable=protected-access
+    assert other_shell._connection() is connection  # pylint: disable=protected-access
+    shell.close()
+    shell.close()
+    assert not connection.closed
+    del other_shell
+    assert connection.closed
+
+
+def test_shell_put(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test put is retried, from the same position, only if the transport of a reused connection died."""
+    shell = tgn_server.SshShell("host", "user", "password")
+    local = BytesIO(b"header data")
+    local.read(7)
+    connection = shell._connection()  # pylint: disable=protected-access
+    connection.put_error = FileNotFoundError()
+    with pytest.raises(FileNotFoundError):
+        shell.put(local, "/tmp/remote")
+    assert not connection.closed
+
+    local.seek(7)
+    connection.put_error = EOFError()
+    connection.transport.active = False
+    shell.put(local, "/tmp/remote")
+    new_connection = tgn_ssh_pool.get("host", "user", "password")
+    assert new_connection is not connection
+    assert new_connection.uploaded == [(b"data", "/tmp/remote")]
+
+    def put_on_dead_transport(connection: FakeConnection, *_: object) -> None:
+        connection.transport.active = False
+        raise EOFError()
+
+    monkeypatch.setattr(FakeConnection, "put", put_on_dead_transport)
+    with pytest.raises(EOFError):
+        tgn_server.SshShell("other_host", "user", "password").put("/tmp/local", "/tmp/remote")
+
+
+def test_discard() -> None:
+    """Test discard and close_all close and remove pooled connections."""
+    connection = tgn_ssh_pool.acquire("host", "user", "password")
+    other_connection = tgn_ssh_pool.acquire("other_host", "user", "password")
+    tgn_ssh_pool.discard("host", "user", "password")
+    assert connection.closed
+    assert tgn_ssh_pool.get("host", "user", "password") is None
+    assert tgn_ssh_pool.get("other_host", "user", "password") is other_connection
+    tgn_ssh_pool.discard("host", "user", "password")
+    assert tgn_ssh_pool.connect("host", "user", "password") is not connection
+    tgn_ssh_pool.close_all()
+    assert other_connection.closed
+    assert tgn_ssh_pool.get("other_host", "user", "password") is None
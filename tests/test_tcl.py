@@ -4,6 +4,7 @@ Tests for TGN Tcl wrapper - the default wrapper.
 # pylint: disable=redefined-outer-name
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
@@ -30,6 +31,9 @@ def test_list(tcl: TgnTclWrapper) -> None:
     py_list = ["a", "b b"]
     tcl_list_length = tcl.eval("llength " + py_list_to_tcl_list(py_list))
     assert int(tcl_list_length) == 2
+    py_list = ["a{", "}b", "c\\", ""]
+    assert tcl.eval("lindex " + py_list_to_tcl_list(py_list) + " 2") == "c\\"
+    assert int(tcl.eval("llength " + py_list_to_tcl_list(py_list))) == 4
 
     tcl_list = "{a} {b b}"
     python_list = tcl_list_2_py_list(tcl_list)
@@ -56,6 +60,60 @@ def test_list(tcl: TgnTclWrapper) -> None:
     tcl_list = '[["a"], ["b", "b"]]'
     assert len(tcl_list_2_py_list(tcl_list)) == 2
 
+    tcl_list = "{{a b} {c d}} {{e f}}"
+    assert tcl_list_2_py_list(tcl_list) == [["a b", "c d"], ["e", "f"]]
+
+    tcl_list = 'a\\ b "c d" e'
+    assert tcl_list_2_py_list(tcl_list) == ["a b", "c d", "e"]
+
+    # Single element that is not a valid list itself is not unwrapped.
+    assert tcl_list_2_py_list('{"b}') == ['"b']
+    assert tcl_list_2_py_list('{"}') == ['"']
+    assert tcl_list_2_py_list('{\\y "}') == ['\\y "']
+    with pytest.raises(ValueError):
+        tcl_list_2_py_list('a "b')
+    with pytest.raises(ValueError):
+        tcl_list_2_py_list("{a}b")
+
+
+def test_list_backslashes() -> None:
+    """Test Tcl backslash substitution in Tcl->Python list conversion."""
+    assert tcl_list_2_py_list("a\\x41b \\xg") == ["aAb", "xg"]
+    assert tcl_list_2_py_list("\\101z \\777") == ["Az", "?7"]
+    assert tcl_list_2_py_list("\\u00e9x \\U0001F600") == ["\u00e9x", "\U0001F600"]
+    assert tcl_list_2_py_list("a\\\n   b c") == ["a b", "c"]
+    # No substitution within braces.
+    assert tcl_list_2_py_list("{a\\\nb} c") == ["a\\\nb", "c"]
+
+
+def test_eval_batch(tcl: TgnTclWrapper) -> None:
+    """Test batch execution of Tcl commands."""
+    assert tcl.eval_batch(["set a 1", "set b {x y}", "llength $b"]) == ["1", "x y", "2"]
+    assert tcl.eval("set a") == "1"
+
+
+def test_batch(tcl: TgnTclWrapper) -> None:
+    """Test queuing Tcl commands in batch context."""
+    with tcl.batch():
+        assert tcl.eval("set c 1") == ""
+        assert tcl.eval("incr c") == ""
+        assert tcl.eval("set c", expect_result=True) == "2"
+        tcl.eval("incr c")
+    assert tcl.eval("set c") == "3"
+    with pytest.raises(ValueError):
+        with tcl.batch():
+            tcl.eval("incr c")
+            raise ValueError()
+    assert tcl.eval("set c") == "3"
+
+
+def test_threads(tcl: TgnTclWrapper, logger: logging.Logger) -> None:
+    """Test wrappers created in different threads use different interpreters."""
+    tcl.eval("set a 1")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(lambda: TgnTclWrapper(logger).eval("set a 2")).result() == "2"
+    assert tcl.eval("set a") == "1"
+
 
 def test_file_name() -> None:
     """Test Tcl file names normalization."""
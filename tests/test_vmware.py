@@ -2,17 +2,17 @@
 Test VMWare operations.
 """
 # pylint: disable=redefined-outer-name
-from typing import Iterable
+from types import SimpleNamespace
+from typing import Iterable, List, Tuple
 
 import pytest
+from pyVim import connect
 from vmwc import VMWareClient
 
 from tests.test_server import TgnTestSutUtils
 from trafficgenerator.tgn_server import Server
 from trafficgenerator.tgn_vmware import TgnVMWareClientException, VMWare
 
-pytestmark = pytest.mark.vmware
-
 
 @pytest.fixture
 def machine(sut_utils: TgnTestSutUtils, vmware: TgnTestSutUtils) -> Iterable[Server]:
@@ -24,6 +24,7 @@ def machine(sut_utils: TgnTestSutUtils, vmware: TgnTestSutUtils) -> Iterable[Ser
 
 
 # pylint: disable=protected-access
+@pytest.mark.vmware
 def test_power(vmware: VMWare, machine: Server) -> None:
     """Test power on and off operations."""
     with VMWareClient(vmware.host, vmware.username, vmware.password) as client:
@@ -41,6 +42,7 @@ def test_power(vmware: VMWare, machine: Server) -> None:
 
 
 # pylint: disable=protected-access
+@pytest.mark.vmware
 def test_negative(vmware: VMWare, machine: Server) -> None:
     """Negative tests."""
     with pytest.raises(TgnVMWareClientException):
@@ -57,3 +59,39 @@ def test_negative(vmware: VMWare, machine: Server) -> None:
         vmware._wait_on(vm)
         with pytest.raises(TgnVMWareClientException):
             vmware._wait_vmware_tools(vm, timeout=0)
+
+
+@pytest.mark.parametrize(
+    "ip_or_name, lookup",
+    [("10.0.0.1", "ip"), ("255.255.255.255", "ip"), ("256.1.1.1", "name"), ("vm-name", "name"), ("1.2.3.4.5", "name")],
+)
+def test_get_vm_ip_or_name(monkeypatch: pytest.MonkeyPatch, ip_or_name: str, lookup: str) -> None:
+    """Test _get_vm looks up by IP only for valid IPv4 addresses."""
+    vmware = VMWare("host", "user", "password")
+    monkeypatch.setattr(vmware, "_get_vm_by_ip", lambda client, ip: ("ip", ip))
+    monkeypatch.setattr(vmware, "_get_vm_by_name", lambda client, name: ("name", name))
+    result: Tuple[str, str] = vmware._get_vm(None, ip_or_name)  # type: ignore[arg-type,assignment]
+    assert result == (lookup, ip_or_name)
+
+
+def test_session(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the long-lived session survives using VMWare as VMWareClient context manager."""
+    logins: List[SimpleNamespace] = []
+    logouts: List[SimpleNamespace] = []
+
+    def smart_connect(**_: object) -> SimpleNamespace:
+        content = SimpleNamespace(sessionManager=SimpleNamespace(currentSession="session"))
+        service_instance = SimpleNamespace(RetrieveContent=lambda: content)
+        logins.append(service_instance)
+        return service_instance
+
+    monkeypatch.setattr(connect, "SmartConnect", smart_connect)
+    monkeypatch.setattr(connect, "Disconnect", logouts.append)
+    vmware = VMWare("host", "user", "password")
+    with vmware:
+        pass
+    client = vmware._connect()
+    assert vmware._connect() is client
+    assert len(logins) == 2
+    vmware.close()
+    assert logouts == logins
@@ -5,20 +5,28 @@ from __future__ import annotations
 
 import gc
 import json
+import re
 from abc import ABC, abstractmethod
 from collections import OrderedDict
-from typing import Dict, List, Optional, Type, Union
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Type, Union
 
 from trafficgenerator import TgnError
 
-
 # Workaround IXN object reference bugs.
 # Object reference with float sequential number instead of integer.
 #    For example, endpointset->sources attribute might return:
 #    vport:1/protocols/bgp/neighborRange:1.0/routeRange:1.
 # Object reference with neighborPairs (plural) instead of neighborPair (single).
+_WA_OBJ_REF_PATTERN = re.compile(r"\.0|neighborPairs:")
+_WA_OBJ_REF_REPLACEMENTS = {".0": "", "neighborPairs:": "neighborPair:"}
+
+
 def _wa_norm_obj_ref(obj_ref: str) -> str:
-    return obj_ref.replace(".0", "").replace("neighborPairs:", "neighborPair:")
+    return _WA_OBJ_REF_PATTERN.sub(lambda match: _WA_OBJ_REF_REPLACEMENTS[match.group(0)], obj_ref)
+
+
+def _lower_types(types: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(t.lower() for t in types)
 
 
 class TgnObjectsDict(OrderedDict):
@@ -29,8 +37,11 @@ class TgnObjectsDict(OrderedDict):
     """
 
     def __setitem__(self, key: TgnObject, value: object) -> None:
-        """Verify that key is TgnObject and set self[key] to value."""
-        if not isinstance(key, TgnObject):
+        """Verify that key is TgnObject and set self[key] to value.
+
+        The verification is skipped when running optimized (python -O).
+        """
+        if __debug__ and not isinstance(key, TgnObject):
             raise TgnError(f"TgnObjectsDict keys must be TgnObject, not {type(key)}")
         OrderedDict.__setitem__(self, key, value)  # type: ignore
 
@@ -42,7 +53,8 @@ class TgnObjectsDict(OrderedDict):
         if key in self.keys():
             return OrderedDict.__getitem__(self, key)  # type: ignore
         for obj in self:
-            if key in [obj.name, obj.ref]:
+            # Two comparisons rather than "key in (obj.name, obj.ref)" to avoid building a tuple per object.
+            if obj.name == key or obj.ref == key:  # pylint: disable=consider-using-in
                 return OrderedDict.__getitem__(self, obj)
         raise KeyError(key)
 
@@ -99,6 +111,25 @@ class TgnSubStatsDict(TgnObjectsDict):
 class TgnObject(ABC):
     """Base class for all TGN classes."""
 
+    # Core attributes are slots for fast access. Sub-classes that do not define __slots__ still get a __dict__.
+    __slots__ = (
+        "_data",
+        "_name",
+        "_ref",
+        "_type",
+        "_type_lower",
+        "_parent",
+        "_index",
+        "_id",
+        "objects",
+        "api",
+        "logger",
+        "__weakref__",
+    )
+
+    # Frequently accessed _data keys are mirrored to direct attributes by _set_data.
+    _data_attributes = {"name": "_name", "objRef": "_ref", "objType": "_type", "parent": "_parent", "index": "_index"}
+
     def __init__(self, parent: Union[TgnObject, None], **data: str) -> None:
         """Create new TGN object in the API.
 
@@ -108,21 +139,28 @@ class TgnObject(ABC):
         """
         super().__init__()
         self._data: dict = {}
+        self._name: Optional[str] = None
+        self._ref: Optional[str] = None
+        self._type: Optional[str] = None
+        self._type_lower: Optional[str] = None
+        self._parent: Optional[TgnObject] = None
+        self._index: object = None
+        self._id: Optional[int] = None
         self.objects: dict = OrderedDict()
         self._set_data(**data)
-        self._data["parent"] = parent
-        if self.parent:
-            self.api = self.parent.api
-            self.logger = self.parent.logger
+        self._set_data(parent=parent)
+        if self._parent:
+            self.api = self._parent.api
+            self.logger = self._parent.logger
         if "objRef" not in self._data:
-            self._data["objRef"] = self._create()
+            self._set_data(objRef=self._create())
         if "name" not in self._data:
-            self._data["name"] = self.ref
-        if self._data.get("parent", None):
-            self._data["parent"].objects[self.ref] = self
+            self._set_data(name=self._ref)
+        if self._parent:
+            self._parent.objects[self._ref] = self
 
     def __str__(self) -> str:
-        return self.name
+        return str(self.name)
 
     def get_child(self, *types: str) -> Optional[TgnObject]:
         """Return the first (and for most useful cases only) child of the requested type(s).
@@ -167,28 +205,21 @@ class TgnObject(ABC):
 
         :param types: requested object types.
         """
-        if not types:
-            return list(self.objects.values())
-        types_l = [o.lower() for o in types]
-        return [o for o in self.objects.values() if o.type.lower() in types_l]
+        return self._filter_objects_by_type(_lower_types(types) if types else None)
 
     def get_object_by_type(self, *types: str) -> Optional[TgnObject]:
         """Return the first child object stored in memory (without re-reading them from the TGN).
 
         :param types: requested object types.
         """
-        children = self.get_objects_by_type(*types)
-        return children[0] if any(children) else None
+        return next(self._iter_objects_by_type(_lower_types(types) if types else None), None)
 
     def get_objects_by_type_in_subtree(self, *types: str) -> List[TgnObject]:
         """Return all children of the specified types.
 
         :param types: requested object types.
         """
-        typed_objects = self.get_objects_by_type(*types)
-        for child in self.objects.values():
-            typed_objects += child.get_objects_by_type_in_subtree(*types)
-        return typed_objects
+        return self._get_objects_by_type_in_subtree(_lower_types(types) if types else None)
 
     def get_objects_or_children_by_type(self, *types: str) -> List[TgnObject]:
         """Return objects if children already been read or get children.
@@ -207,8 +238,11 @@ class TgnObject(ABC):
 
         :param types: requested object types.
         """
-        objects = self.get_objects_or_children_by_type(*types)
-        return objects[0] if any(objects) else None
+        obj = self.get_object_by_type(*types)
+        if obj is not None:
+            return obj
+        children = self.get_children(*types)
+        return children[0] if children else None
 
     def get_objects_with_object(self, obj_type: str, *child_types: str) -> List[TgnObject]:
         """Return all children of the requested type that have the requested child types.
@@ -276,13 +310,13 @@ class TgnObject(ABC):
         return [o for o in gc.get_objects() if isinstance(o, cls)]
 
     #
-    # Simple utilities to return object _data. Maybe it's not Pythonic (more like Java) but after
+    # Simple utilities to return object data. Maybe it's not Pythonic (more like Java) but after
     # changing the key name couple of times I decided to go for it.
     #
 
     def obj_name(self) -> str:
         """Object name."""
-        return self._data["name"]
+        return self._name
 
     name = property(obj_name)
 
@@ -294,19 +328,19 @@ class TgnObject(ABC):
         for API calls.
         If the reference is not used for API calls, use index or relative index for API calls.
         """
-        return self._data["objRef"]
+        return self._ref
 
     ref = property(obj_ref)
 
     def obj_type(self) -> str:
         """Object type."""
-        return self._data["objType"]
+        return self._type
 
     type = property(obj_type)  # noqa: A003
 
     def obj_parent(self) -> TgnObject:
         """Object parent."""
-        return self._data["parent"]
+        return self._parent
 
     parent = property(obj_parent)
 
@@ -315,13 +349,18 @@ class TgnObject(ABC):
 
         Object index structure is something like chassis/card/port.
         """
-        return str(self._data["index"])
+        return str(self._index)
 
     index = property(obj_index)
 
     def obj_id(self) -> int:
-        """Object ID is the relative ID of the object."""
-        return int(self.index.split("/", maxsplit=1)[-1]) if self.index else None
+        """Object ID is the relative ID of the object.
+
+        The ID is parsed from the index on first access and cached until the index changes.
+        """
+        if self._id is None and self._index is not None and self.index:
+            self._id = int(self.index.split("/", maxsplit=1)[-1])
+        return self._id
 
     id = property(obj_id)  # noqa: A003
 
@@ -329,8 +368,31 @@ class TgnObject(ABC):
     # Private methods.
     #
 
-    def _set_data(self, **data: str) -> None:
+    def _set_data(self, **data: object) -> None:
+        """Update object data. Object data must be updated only via this method to keep direct attributes in sync."""
+        if "index" in data:
+            self._id = None
         self._data.update(data)
+        for key, value in data.items():
+            attribute = self._data_attributes.get(key)
+            if attribute:
+                setattr(self, attribute, value)
+        if "objType" in data:
+            self._type_lower = self._type.lower() if self._type else self._type
+
+    def _iter_objects_by_type(self, types_l: Optional[FrozenSet[str]]) -> Iterator[TgnObject]:
+        if types_l is None:
+            return iter(self.objects.values())
+        return (o for o in self.objects.values() if o._type_lower in types_l)  # pylint: disable=protected-access
+
+    def _filter_objects_by_type(self, types_l: Optional[FrozenSet[str]]) -> List[TgnObject]:
+        return list(self._iter_objects_by_type(types_l))
+
+    def _get_objects_by_type_in_subtree(self, types_l: Optional[FrozenSet[str]]) -> List[TgnObject]:
+        typed_objects = self._filter_objects_by_type(types_l)
+        for child in self.objects.values():
+            typed_objects += child._get_objects_by_type_in_subtree(types_l)  # pylint: disable=protected-access
+        return typed_objects
 
     def _build_children_objs(self, child_type: str, children: List[str]) -> OrderedDict[str, TgnObject]:
         children_objs = OrderedDict()
@@ -2,64 +2,129 @@
 Classes and functions to manage a Server in the Testbed.
 """
 import logging
-import os
+import re
 import socket
-import subprocess
 import time
-from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
 from pathlib import Path
-from typing import Optional, Union
+from typing import IO, Dict, List, Optional, Tuple, Union
 
 import fabric.runners
 from fabric import Connection
 from invoke import ThreadException, UnexpectedExit
 from paramiko.ssh_exception import NoValidConnectionsError, SSHException
 
+from trafficgenerator import tgn_ssh_pool
+from trafficgenerator.tgn_utils import poll
 from trafficgenerator.tgn_vmware import VMWare
 
 logging.getLogger("paramiko").setLevel(logging.WARNING)
 logging.getLogger("invoke").setLevel(logging.WARNING)
 logger = logging.getLogger("tgn.trafficgenerator")
 
+SSH_PORT = 22
+UPTIME_MINUTES = re.compile(r"up (\d+) minutes?$")
+
 
 class SshShell:
     """SSH connection to Server in the Testbed.
 
+    Connections are taken from the process wide pool, so all shells to the same host and credentials share one SSH
+    session. Each shell holds one reference to the pooled session, released on close or garbage collection.
+
     :TODO: Consider extending Connection rather than using it.
     """
 
-    def __init__(self, host: str, user: str, password: str) -> None:
+    def __init__(self, host: str, user: str, password: str, keepalive_interval: int = 30) -> None:
         """Initialize Connection object.
 
         :param host: Hostname or ipaddress.
         :param user: Username.
         :param password: Password for user.
+        :param keepalive_interval: Seconds between SSH keepalive packets, so idle connections are not dropped by
+            firewalls/NAT. 0 to disable keepalive.
         """
         self.host = host
         self.user = user
         self.password = password
+        self.keepalive_interval = keepalive_interval
+        self._acquired = False
+
+    def __del__(self) -> None:
+        """Release the pooled connection reference on garbage collection."""
+        with suppress(Exception):
+            self.close()
+
+    def __enter__(self) -> "SshShell":
+        """Return self to allow using SshShell as context manager."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Close the connection on context exit."""
+        self.close()
 
     def exec_cmd(self, cmd: str) -> fabric.runners.Result:
         """Execute the requested command.
 
+        The command is never retried, as it might have reached the remote host before the connection failed.
+
         :param cmd: Command to run.
         """
         logger.debug(f"Executing command: {cmd}")
-        with Connection(self.host, user=self.user, connect_kwargs={"password": self.password}) as connection:
-            result = connection.run(cmd, hide=True)
+        result = self._connection().run(cmd, hide=True)
         logger.debug(f"Command output: {result.stdout.strip()}")
         return result
 
-    def put(self, local: Union[str, StringIO], remote: str) -> None:
-        """Put a local file to the remote filesystem."""
+    def put(self, local: Union[str, IO], remote: str) -> None:
+        """Put a local file to the remote filesystem.
+
+        This is the only operation retried (once, over a new connection) if the transport of a reused pooled connection
+        died, as uploading the same file again is harmless. File-like sources are rewound before the retry.
+        """
         logger.info(f"Putting {local} to {remote}")
-        with Connection(self.host, user=self.user, connect_kwargs={"password": self.password}) as connection:
+        position = 0 if isinstance(local, str) else local.tell()
+        reused = tgn_ssh_pool.get(self.host, self.user, self.password) is not None
+        connection = self._connection()
+        try:
             connection.put(local, remote)
+        except (SSHException, EOFError, socket.error):
+            # Local file and SFTP errors (missing file, permissions...) leave the transport active and are not retried.
+            if not reused or (connection.transport is not None and connection.transport.is_active()):
+                raise
+            self.disconnect()
+            if not isinstance(local, str):
+                local.seek(position)
+            self._connection().put(local, remote)
+
+    def close(self) -> None:
+        """Release this shell reference to the pooled connection, the connection is closed when no shell uses it."""
+        if self._acquired:
+            self._acquired = False
+            tgn_ssh_pool.release(self.host, self.user, self.password)
+
+    def disconnect(self) -> None:
+        """Close the pooled connection, known to be dead, so the next command (from any shell to the host) reconnects."""
+        tgn_ssh_pool.discard(self.host, self.user, self.password)
+
+    def _connection(self) -> Connection:
+        """Return live pooled connection, reconnecting before sending anything if the pooled transport is not active."""
+        if not self._acquired:
+            # Set before acquire, as acquire adds the reference even if connecting fails.
+            self._acquired = True
+            return tgn_ssh_pool.acquire(self.host, self.user, self.password, self.keepalive_interval)
+        return tgn_ssh_pool.connect(self.host, self.user, self.password, self.keepalive_interval)
 
 
 class Server:
     """Server in the Testbed. Provides SSH and VMWare connectivity to the remote host."""
 
+    # Seconds to reuse the last is_up result before probing again.
+    IS_UP_TTL = 0.5
+    # Initial and maximum delays, in seconds, between state polls in wait2up, wait2down and wait_reboot.
+    POLL_DELAY = 0.1
+    POLL_MAX_DELAY = 2.0
+
     def __init__(self, name: str, host: str, user: str, password: str, vmware: Optional[VMWare] = None) -> None:
         """Initialize SSH and VMWare objects.
 
@@ -75,11 +140,24 @@ class Server:
         self.password = password
         self.ssh = SshShell(self.host, self.user, self.password)
         self.vmware = vmware
+        self._up_cache: Optional[Tuple[float, bool]] = None
 
     def __repr__(self) -> str:
         """Server is represented by its name."""
         return f"{self.name}"
 
+    def __enter__(self) -> "Server":
+        """Return self to allow using Server as context manager."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Close the SSH connection on context exit."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the SSH connection to the server."""
+        self.ssh.close()
+
     def exec_cmd(self, cmd: str) -> fabric.runners.Result:
         """Execute the requested SSH command.
 
@@ -87,7 +165,7 @@ class Server:
         """
         return self.ssh.exec_cmd(cmd)
 
-    def put(self, local: Union[Path, StringIO], remote: Path) -> None:
+    def put(self, local: Union[Path, IO], remote: Path) -> None:
         """Put a local file to the remote filesystem."""
         self.ssh.put(local.as_posix() if isinstance(local, Path) else local, remote.as_posix())
 
@@ -95,7 +173,7 @@ class Server:
         """Power on virtual machine.
 
         :param wait: wait for system to come up or not
-        :param timeout: time to wait for system to become pingable
+        :param timeout: time to wait for system to become reachable
         """
         if self.vmware:
             self.vmware.power_on(self.name)
@@ -108,7 +186,7 @@ class Server:
         """Shutdown virtual machine.
 
         :param wait: wait for system to down or not
-        :param timeout: time to wait for system to become non-pingable (go down).
+        :param timeout: time to wait for system to become unreachable (go down).
         """
         if self.vmware:
             self.vmware.power_off(self.name, wait_off=False)
@@ -117,45 +195,57 @@ class Server:
         else:
             raise ValueError(f"VMWare client not found for machine {self}")
 
-    def is_up(self) -> bool:
-        """Ping to check if host is UP or not."""
-        count_arg = "n" if os.name == "nt" else "c"
-        ping_cmd = ["ping", self.host, f"-{count_arg}", "1", "-w", "1"]
-        output = subprocess.run(ping_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
-        state = (
-            output.returncode == 0
-            and b"Destination host unreachable" not in output.stdout
-            and b"Request timed out" not in output.stdout
-        )
+    def is_up(self, force: bool = False) -> bool:
+        """Probe the SSH port to check if host is UP or not.
+
+        :param force: probe even if the last probe result is younger than IS_UP_TTL seconds.
+        """
+        if not force and self._up_cache and time.monotonic() - self._up_cache[0] < self.IS_UP_TTL:
+            return self._up_cache[1]
+        try:
+            with socket.create_connection((self.host, SSH_PORT), timeout=1):
+                state = True
+        except OSError:
+            state = False
+        self._up_cache = (time.monotonic(), state)
         logger.debug(f"{self} state is {'UP' if state else 'DOWN'}")
         return state
 
+    @staticmethod
+    def batch_is_up(servers: List["Server"]) -> Dict["Server", bool]:
+        """Probe all servers concurrently and return the UP/DOWN state of each server.
+
+        :param servers: Servers to probe.
+        """
+        if not servers:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(servers)) as executor:
+            return dict(zip(servers, executor.map(lambda server: server.is_up(), servers)))
+
     def wait2down(self, timeout: int = 30) -> None:
-        """Wait for timeout seconds for host to become non-pingable (go down).
+        """Wait for timeout seconds for host to become unreachable (go down).
 
         :param timeout: wait for time in seconds
         """
         logger.info(f"Waiting for host {self} to go DOWN")
-        for _ in range(timeout):
-            if not self.is_up():
+        for _ in poll(timeout, self.POLL_DELAY, self.POLL_MAX_DELAY):
+            if not self.is_up(force=True):
                 logger.info(f"{self} is DOWN")
                 return
-            time.sleep(1)
 
         logger.exception(f"{self} did not went DOWN in {timeout} seconds")
         raise TimeoutError(f"{self} did not went DOWN in {timeout} seconds")
 
     def wait2up(self, timeout: int = 60) -> None:
-        """Wait for timeout seconds for host to become pingable [come up].
+        """Wait for timeout seconds for host to become reachable [come up].
 
         :param timeout: wait for time in seconds
         """
         logger.info(f"Waiting for host {self} to go UP")
-        for _ in range(timeout):
-            if self.is_up():
+        for _ in poll(timeout, self.POLL_DELAY, self.POLL_MAX_DELAY):
+            if self.is_up(force=True):
                 logger.info(f"{self} is UP")
                 return
-            time.sleep(1)
 
         logger.exception(f"{self} did not went UP in {timeout} seconds")
         raise TimeoutError(f"{self} did not went UP in {timeout} seconds")
@@ -170,21 +260,39 @@ class Server:
             self.exec_cmd("/usr/sbin/reboot")
         except (UnexpectedExit, ThreadException):
             pass
+        # The pooled connection dies with the reboot, drop it so the next command reconnects.
+        self.ssh.disconnect()
         if wait:
             self.wait_reboot(timeout)
 
     def wait_reboot(self, timeout: int = 60) -> None:
         """Wait for reboot."""
-        for _ in range(timeout):
+        for _ in poll(timeout, self.POLL_DELAY, self.POLL_MAX_DELAY):
             try:
                 with Connection(
                     self.host, user=self.user, connect_kwargs={"password": self.password}, connect_timeout=1
                 ) as connection:
                     up_time = connection.run("uptime -p", hide=True).stdout.strip()
                 # In some distros (like centos 7) if uptime < 1 the output will be "up", in others "up 0 minutes".
-                if up_time == "up" or float(up_time.split()[1]) < timeout / 60:
+                # Longer uptimes (hours, days...) mean the server did not reboot yet.
+                up_minutes = UPTIME_MINUTES.match(up_time)
+                if up_time == "up" or (up_minutes and int(up_minutes.group(1)) < timeout / 60):
                     return
             except (NoValidConnectionsError, socket.timeout, SSHException):
                 pass
-            time.sleep(1)
         raise TimeoutError(f"{self.host} did not reboot after {timeout} seconds")
+
+
+def reboot_servers(servers: List[Server], wait: bool = True, timeout: Optional[int] = 60) -> None:
+    """Reboot multiple servers concurrently and wait for all of them to come up.
+
+    Raise the first error of any server after all reboots completed.
+
+    :param servers: Servers to reboot.
+    :param wait: wait for servers to come up or not.
+    :param timeout: time to wait for each server to come up.
+    """
+    if not servers:
+        return
+    with ThreadPoolExecutor(max_workers=len(servers)) as executor:
+        list(executor.map(lambda server: server.reboot(wait, timeout), servers))
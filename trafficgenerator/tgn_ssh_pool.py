@@ -0,0 +1,131 @@
+"""
+Process wide pool of SSH connections shared by all SshShell objects.
+
+Connections are keyed by (host, user, password hash) so all shells to the same host with the same credentials share a
+single SSH session. Each shell holds a reference (acquire/release) and the session is closed when the last reference
+is released.
+"""
+import atexit
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+from fabric import Connection
+
+_Key = Tuple[str, str, str]
+
+_connections: Dict[_Key, Connection] = {}
+_references: Dict[_Key, int] = {}
+_lock = threading.Lock()
+
+
+def acquire(host: str, user: str, password: str, keepalive_interval: int = 30) -> Connection:
+    """Add a reference to the connection to host as user and return it open, (re)connecting if required.
+
+    Each acquire must be matched by a release.
+
+    :param host: Hostname or ipaddress.
+    :param user: Username.
+    :param password: Password for user.
+    :param keepalive_interval: Seconds between keepalive packets on new connections, 0 to disable keepalive.
+    """
+    key = _key(host, user, password)
+    with _lock:
+        _references[key] = _references.get(key, 0) + 1
+        return _open(key, password, keepalive_interval)
+
+
+def connect(host: str, user: str, password: str, keepalive_interval: int = 30) -> Connection:
+    """Return open connection to host as user, (re)connecting if required, without adding a reference.
+
+    For holders of a reference, see acquire.
+
+    :param host: Hostname or ipaddress.
+    :param user: Username.
+    :param password: Password for user.
+    :param keepalive_interval: Seconds between keepalive packets on new connections, 0 to disable keepalive.
+    """
+    key = _key(host, user, password)
+    with _lock:
+        return _open(key, password, keepalive_interval)
+
+
+def release(host: str, user: str, password: str) -> None:
+    """Drop a reference to the connection to host as user, closing the connection when the last reference is dropped.
+
+    :param host: Hostname or ipaddress.
+    :param user: Username.
+    :param password: Password for user.
+    """
+    key = _key(host, user, password)
+    with _lock:
+        references = _references.pop(key, 0) - 1
+        if references > 0:
+            _references[key] = references
+            return
+        connection = _connections.pop(key, None)
+    if connection:
+        connection.close()
+
+
+def get(host: str, user: str, password: str) -> Optional[Connection]:
+    """Return the open pooled connection to host as user, or None if there is no such connection.
+
+    :param host: Hostname or ipaddress.
+    :param user: Username.
+    :param password: Password for user.
+    """
+    connection = _connections.get(_key(host, user, password))
+    return connection if connection and _is_active(connection) else None
+
+
+def discard(host: str, user: str, password: str) -> None:
+    """Close and remove the pooled connection to host as user, if exists, keeping its references.
+
+    Use when the connection is known to be dead (e.g. the host rebooted), the next user will reconnect.
+
+    :param host: Hostname or ipaddress.
+    :param user: Username.
+    :param password: Password for user.
+    """
+    with _lock:
+        connection = _connections.pop(_key(host, user, password), None)
+    if connection:
+        connection.close()
+
+
+def close_all() -> None:
+    """Close and remove all pooled connections and references."""
+    with _lock:
+        connections = list(_connections.values())
+        _connections.clear()
+        _references.clear()
+    for connection in connections:
+        connection.close()
+
+
+def _key(host: str, user: str, password: str) -> _Key:
+    """Return pool key, the password is hashed so it is not kept in the pool in clear text."""
+    return host, user, hashlib.sha256(password.encode()).hexdigest()
+
+
+def _open(key: _Key, password: str, keepalive_interval: int) -> Connection:
+    """Return open pooled connection for key, replacing it if its transport is not active. Call with _lock held."""
+    connection = _connections.get(key)
+    if not connection or not _is_active(connection):
+        if connection:
+            connection.close()
+        host, user, _ = key
+        connection = Connection(host, user=user, connect_kwargs={"password": password})
+        connection.open()
+        connection.transport.set_keepalive(keepalive_interval)
+        _connections[key] = connection
+    return connection
+
+
+def _is_active(connection: Connection) -> bool:
+    """Return True if the connection transport is still active, i.e. it is safe to send over the connection."""
+    return connection.transport is not None and connection.transport.is_active()
+
+
+atexit.register(close_all)
@@ -3,8 +3,11 @@ Base class and utilities for TGN Python Tcl wrapper.
 """
 import json
 import logging
-from os import path
-from typing import Dict, List, Optional
+import posixpath
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from trafficgenerator.tgn_object import TgnObject
 from trafficgenerator.tgn_utils import new_log_file
@@ -12,15 +15,16 @@ from trafficgenerator.tgn_utils import new_log_file
 # Tcl is must only if the test chooses to use Tcl API, so it is OK if Tcl is not installed (e.g for some Linux
 # installations). If Tcl interpreter is required and not installed it will fail anyway...
 try:
-    from tkinter import Tcl
-
-    from _tkinter import TclError
+    from tkinter import Tcl, Tk
 
     tcl_interp_g: "TgnTk" = None
-    """ Global Tcl interpreter for Tcl based utilities. Does not log its operations. """
+    """ Global Tcl interpreter for Tcl based utilities, set by the main thread. Does not log its operations. """
 except ModuleNotFoundError:
     pass
 
+_tcl_interps = threading.local()
+""" Per thread Tcl interpreters, as a Tcl interpreter can be used only by the thread that created it. """
+
 
 def tcl_str(string: str = "") -> str:
     """Return Tcl string surrounded by {}.
@@ -30,12 +34,15 @@ def tcl_str(string: str = "") -> str:
     return " {" + string + "} "
 
 
+_BACKSLASH_TO_SLASH = str.maketrans("\\", "/")
+
+
 def tcl_file_name(name: str) -> str:
     """Return normalized file name with forward slashes.
 
     :param name: file name.
     """
-    return tcl_str(path.normpath(name).replace("\\", "/"))
+    return tcl_str(posixpath.normpath(name.translate(_BACKSLASH_TO_SLASH)))
 
 
 def get_args_pairs(arguments: Dict[str, object]) -> str:
@@ -43,7 +50,12 @@ def get_args_pairs(arguments: Dict[str, object]) -> str:
 
     :param arguments: Python dictionary of TGN API command arguments <key, value>.
     """
-    return " ".join(" ".join(["-" + k, tcl_str(str(v))]) for k, v in arguments.items())
+    if not arguments:
+        return ""
+    if len(arguments) == 1:
+        key, value = next(iter(arguments.items()))
+        return f"-{key} {{{value}}} "
+    return " ".join([f"-{k} {{{v}}} " for k, v in arguments.items()])
 
 
 def build_obj_ref_list(objects: List[TgnObject]) -> str:
@@ -51,44 +63,210 @@ def build_obj_ref_list(objects: List[TgnObject]) -> str:
 
     :param objects: Python list of requested objects.
     """
+    if not objects:
+        return ""
+    if len(objects) == 1:
+        return objects[0].ref
     return " ".join([o.ref for o in objects])
 
 
+_TCL_BACKSLASH_MAP = {"n": "\n", "t": "\t", "r": "\r", "a": "\a", "b": "\b", "f": "\f", "v": "\v"}
+# Backslash sequence: (digits base, max number of digits, max value).
+_TCL_BACKSLASH_NUMBERS = {"x": (16, 2, 0xFF), "u": (16, 4, 0xFFFF), "U": (16, 8, 0x10FFFF)}
+_TCL_OCTAL = (8, 3, 0o377)
+
+
+def _tcl_backslash(string: str, i: int) -> Tuple[str, int]:
+    """Return the substitution of the Tcl backslash sequence at string[i] and the index that follows the sequence.
+
+    :param string: string that contains the backslash sequence.
+    :param i: index of the backslash, must not be the last character of the string.
+    """
+    char = string[i + 1]
+    if char == "\n":
+        # Backslash-newline and the spaces and tabs that follow it are replaced by a single space.
+        end = i + 2
+        while end < len(string) and string[end] in " \t":
+            end += 1
+        return " ", end
+    if char in _TCL_BACKSLASH_NUMBERS:
+        base, max_digits, max_value = _TCL_BACKSLASH_NUMBERS[char]
+        start = i + 2
+    elif "0" <= char <= "7":
+        base, max_digits, max_value = _TCL_OCTAL
+        start = i + 1
+    else:
+        return _TCL_BACKSLASH_MAP.get(char, char), i + 2
+    value = 0
+    end = start
+    while end < len(string) and end - start < max_digits:
+        try:
+            digit = int(string[end], base)
+        except ValueError:
+            break
+        if value * base + digit > max_value:
+            break
+        value = value * base + digit
+        end += 1
+    if end == start:
+        # No digits, e.g. "\xg", the backslash is dropped.
+        return char, start
+    return chr(value), end
+
+
+def _split_tcl_list(tcl_list: str) -> List[str]:
+    """Split Tcl list into its elements, following Tcl list parsing rules (without command substitution).
+
+    :param tcl_list: string representing the Tcl list.
+    :raises ValueError: if the string is not a valid Tcl list (unmatched braces or quotes).
+    """
+    elements: List[str] = []
+    length = len(tcl_list)
+    i = 0
+    while True:
+        while i < length and tcl_list[i].isspace():
+            i += 1
+        if i >= length:
+            return elements
+        if tcl_list[i] == "{":
+            element, i = _split_braced_element(tcl_list, i)
+            elements.append(element)
+            continue
+        quoted = tcl_list[i] == '"'
+        if quoted:
+            i += 1
+        chars: List[str] = []
+        while i < length and (tcl_list[i] != '"' if quoted else not tcl_list[i].isspace()):
+            if tcl_list[i] == "\\" and i + 1 < length:
+                substitution, i = _tcl_backslash(tcl_list, i)
+                chars.append(substitution)
+            else:
+                chars.append(tcl_list[i])
+                i += 1
+        elements.append("".join(chars))
+        if quoted:
+            if i >= length:
+                raise ValueError(f"unmatched open quote in list {tcl_list}")
+            _check_element_end(tcl_list, i + 1, "quotes")
+        i += 1
+
+
+def _split_braced_element(tcl_list: str, i: int) -> Tuple[str, int]:
+    """Return the braced list element that starts at tcl_list[i] and the index that follows the closing brace."""
+    depth = 1
+    start = i = i + 1
+    while i < len(tcl_list) and depth:
+        if tcl_list[i] == "\\":
+            i += 1
+        elif tcl_list[i] == "{":
+            depth += 1
+        elif tcl_list[i] == "}":
+            depth -= 1
+        i += 1
+    if depth:
+        raise ValueError(f"unmatched open brace in list {tcl_list}")
+    _check_element_end(tcl_list, i, "braces")
+    end = i - 1
+    return tcl_list[start:end], i
+
+
+def _check_element_end(tcl_list: str, i: int, delimiters: str) -> None:
+    """Raise ValueError if braced or quoted list element is not followed by space or end of list."""
+    if i < len(tcl_list) and not tcl_list[i].isspace():
+        raise ValueError(f"list element in {delimiters} followed by {tcl_list[i]!r} instead of space in {tcl_list}")
+
+
 def tcl_list_2_py_list(tcl_list: str) -> list:
-    """Recursievely convert embedded Tcl list to embedded Python list using Tcl interpreter.
+    """Recursievely convert embedded Tcl list to embedded Python list.
+
+    A Tcl list that consists of a single (braced) element is unwrapped first, as if it was passed to a Tcl command.
+    JSON lists are also accepted.
 
     :param str tcl_list: string representing the Tcl list.
     """
     if not tcl_list:
         return []
 
-    try:
-        return json.loads(tcl_list)
-    except json.decoder.JSONDecodeError:
+    if tcl_list.lstrip().startswith("["):
+        try:
+            return json.loads(tcl_list)
+        except json.decoder.JSONDecodeError:
+            pass
+    return _copy_list(_parse_tcl_list(tcl_list))
+
+
+@lru_cache(maxsize=4096)
+def _parse_tcl_list(tcl_list: str) -> list:
+    """Parse Tcl list into embedded Python list. The result is cached and shared so it must not be modified."""
+    python_list = _split_tcl_list(tcl_list)
+    if len(python_list) == 1:
+        # Unwrap a single element only if it is a valid list itself, otherwise it is a plain string.
         try:
-            python_list = tcl_interp_g.eval("join " + tcl_list + " LiStSeP").split("LiStSeP")
-        except TclError:
-            python_list = tcl_interp_g.eval("join " + tcl_str(tcl_list) + " LiStSeP").split("LiStSeP")
-        if len([i for i in python_list if "{" in i]) == 0:
-            return python_list
-        return [tcl_list_2_py_list(e) for e in python_list]
+            python_list = _split_tcl_list(python_list[0])
+        except ValueError:
+            pass
+    if python_list == [tcl_list] or not any("{" in i for i in python_list):
+        return python_list
+    return [_element_2_py_list(e) for e in python_list]
+
+
+def _element_2_py_list(element: str) -> object:
+    """Convert embedded list element to Python list, elements that are not valid Tcl lists are kept as strings."""
+    try:
+        return tcl_list_2_py_list(element)
+    except ValueError:
+        return element
+
+
+def _copy_list(py_list: list) -> list:
+    """Copy embedded Python list, much faster than copy.deepcopy."""
+    return [_copy_list(e) if isinstance(e, list) else e for e in py_list]
+
+
+_TCL_SPECIAL_CHARS = frozenset(' \t\n\r\v\f{}[]$;"\\')
+_TCL_BACKSLASH_ESCAPES = {v: k for k, v in _TCL_BACKSLASH_MAP.items()}
+
+
+def _tcl_list_element(element: str) -> str:
+    """Quote string so it is parsed as a single Tcl list element.
+
+    :param element: Python string.
+    """
+    if element and not element.startswith("#") and not _TCL_SPECIAL_CHARS.intersection(element):
+        return element
+    depth = 0
+    for char in element:
+        depth += 1 if char == "{" else -1 if char == "}" else 0
+        if depth < 0:
+            break
+    if depth == 0 and "\\" not in element:
+        return "{" + element + "}"
+    return "".join("\\" + _TCL_BACKSLASH_ESCAPES.get(c, c) if c in _TCL_SPECIAL_CHARS else c for c in element)
 
 
 def py_list_to_tcl_list(py_list: list) -> str:
-    """Convert Python list to Tcl list using Tcl interpreter.
+    """Convert Python list to Tcl list.
 
     :param py_list: Python list.
     """
-    py_list_str = [str(s) for s in py_list]
-    return tcl_str(tcl_interp_g.eval("split" + tcl_str("\t".join(py_list_str)) + "\\t"))
+    return tcl_str(" ".join(_tcl_list_element(str(s)) for s in py_list))
 
 
 class TgnTk:
     """Native Python Tk interpreter."""
 
-    def __init__(self) -> None:
-        """Init Tcl interpreter."""
-        self.tcl = Tcl()
+    def __init__(self, name: str = "") -> None:
+        """Init Tcl interpreter.
+
+        Tcl interpreter initialization is expensive, so all TgnTk objects with the same name, created in the same thread,
+        share the same interpreter - including its global variables.
+
+        :param name: interpreter name, usually the name of the wrapper class that uses the interpreter.
+        """
+        interps: Dict[str, Tk] = _tcl_interps.__dict__.setdefault("interps", {})
+        if name not in interps:
+            interps[name] = Tcl()
+        self.tcl = interps[name]
 
     def eval(self, command: str) -> str:  # noqa: A003
         """Execute Tcl eval command."""
@@ -105,6 +283,8 @@ class TgnTclWrapper:
         This creates a clean Tcl script that can be used later for debug.
         We assume that there might have both multiple Tcl sessions simultaneously so we add suffix to create
         multiple distinguished Tcl scripts.
+        Unless tcl_interp is given, all wrappers of the same class in the same thread share one Tcl interpreter (see
+        TgnTk), so they also share Tcl global variables.
         """
         if not logger:
             logger = logging.getLogger("dummy")
@@ -112,30 +292,90 @@ class TgnTclWrapper:
         self.tcl_script = new_log_file(self.logger, self.__class__.__name__)
 
         if not tcl_interp:
-            self.tcl_interp = TgnTk()
+            self.tcl_interp = TgnTk(self.__class__.__name__)
         else:
             self.tcl_interp = tcl_interp
-        global tcl_interp_g  # pylint: disable=invalid-name, global-statement
-        tcl_interp_g = self.tcl_interp
+        # A Tcl interpreter must be deleted by the thread that created it, so only main thread interpreters go global.
+        if threading.current_thread() is threading.main_thread():
+            global tcl_interp_g  # pylint: disable=invalid-name, global-statement
+            tcl_interp_g = self.tcl_interp
         self.rc: str = None
+        self._batching = False
+        self._pending: List[str] = []
 
-    def eval(self, command: str) -> str:  # noqa: A003
+    def eval(self, command: str, expect_result: bool = False) -> str:  # noqa: A003
         """Execute Tcl command.
 
         Write the command to tcl script (.tcl) log file.
         Execute the command.
         Write the command and the output to general (.txt) log file.
 
+        Inside batch context the command is queued and empty string is returned, unless expect_result is True.
+
         :param command: Command to execute.
+        :param expect_result: If True, execute all queued commands and then the command, and return its output.
         :returns: command raw output.
         """
-        self.logger.debug(command)
-        if self.tcl_script:
-            self.tcl_script.info(command)
+        self._log_command(command)
+        if self._batching and not expect_result:
+            self._pending.append(command)
+            return ""
+        self._flush()
         self.rc = self.tcl_interp.eval(command)
-        self.logger.debug(f"\t{self.rc}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"\t{self.rc}")
         return self.rc
 
+    def eval_batch(self, commands: List[str]) -> List[str]:
+        """Execute multiple Tcl commands with a single interpreter call.
+
+        Commands are logged as in eval, then executed in order at global scope.
+
+        :param commands: Commands to execute.
+        :returns: list of commands raw outputs.
+        """
+        self._flush()
+        for command in commands:
+            self._log_command(command)
+        script = "".join(f"lappend _tgn_batch_out [{command}]\n" for command in commands)
+        self.rc = self.tcl_interp.eval(f"set _tgn_batch_out {{}}\n{script}set _tgn_batch_out")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"\t{self.rc}")
+        return _split_tcl_list(self.rc)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Queue all commands evaluated inside the context and execute them with a single interpreter call on exit.
+
+        If the context body raises, the commands it queued are dropped and not executed.
+        """
+        batching = self._batching
+        queued = len(self._pending)
+        self._batching = True
+        try:
+            yield
+        except BaseException:
+            del self._pending[queued:]
+            raise
+        finally:
+            self._batching = batching
+        if not batching:
+            self._flush()
+
     def source(self, script_file: str) -> None:
         """Tcl source command."""
-        self.eval("source " + tcl_file_name(script_file))
+        self.eval("source " + tcl_file_name(script_file), expect_result=True)
+
+    def _flush(self) -> None:
+        """Execute all queued commands."""
+        if self._pending:
+            script = "\n".join(self._pending)
+            self._pending = []
+            self.rc = self.tcl_interp.eval(script)
+
+    def _log_command(self, command: str) -> None:
+        """Write the command to the general log and to the tcl script, skipping disabled loggers."""
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(command)
+        if self.tcl_script and self.tcl_script.isEnabledFor(logging.INFO):
+            self.tcl_script.info(command)
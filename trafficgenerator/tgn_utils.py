@@ -2,18 +2,37 @@
 TGN projects utilities and errors.
 """
 import logging
+import time
 from collections.abc import Iterable
+from logging.handlers import MemoryHandler
 from os import path
+from typing import Iterator, List, Optional
+
+_TRUE_VALUES = frozenset(("true", "yes", "1", "::ixnet::ok"))
+_FALSE_VALUES = frozenset(("false", "no", "0", "null", "none", "::ixnet::obj-null"))
+_IPV4_VALUES = frozenset(("ipv4", "ipv4if"))
+_IPV6_VALUES = frozenset(("ipv6", "ipv6if"))
+_IP_VALUES = _IPV4_VALUES | _IPV6_VALUES
 
 
 def flatten(ml_list: list) -> list:
-    """Recursievely flatten lists of lists into single list.
+    """Flatten lists of lists (of any depth) into single list.
+
+    Strings and bytes are treated as single items.
 
     :param ml_list: Multi-level list to flatten.
     """
-    if isinstance(ml_list, Iterable):
-        return [a for i in ml_list for a in flatten(i)]
-    return [ml_list]
+    flat_list: List[object] = []
+    stack = [iter([ml_list])]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, Iterable) and not isinstance(item, (str, bytes)):
+                stack.append(iter(item))
+                break
+            flat_list.append(item)
+        else:
+            stack.pop()
+    return flat_list
 
 
 def is_true(str_value: str) -> bool:
@@ -21,7 +40,7 @@ def is_true(str_value: str) -> bool:
 
     :param str_value: String to evaluate.
     """
-    return str_value.lower() in ("true", "yes", "1", "::ixnet::ok")
+    return str_value.lower() in _TRUE_VALUES
 
 
 def is_false(str_value: str) -> bool:
@@ -29,7 +48,7 @@ def is_false(str_value: str) -> bool:
 
     :param str_value: String to evaluate.
     """
-    return str_value.lower() in ("false", "no", "0", "null", "none", "::ixnet::obj-null")
+    return str_value.lower() in _FALSE_VALUES
 
 
 def is_local_host(location: str) -> bool:
@@ -37,7 +56,9 @@ def is_local_host(location: str) -> bool:
 
     :param location: Location string in the format ip[/slot[/port]].
     """
-    return any(x in location.lower() for x in ("localhost", "127.0.0.1", "offline", "null"))
+    # Explicit checks (most common first) are several times faster than any() over a tuple of values.
+    location_l = location.lower()
+    return "127.0.0.1" in location_l or "localhost" in location_l or "offline" in location_l or "null" in location_l
 
 
 def is_ipv4(str_value: str) -> bool:
@@ -45,7 +66,7 @@ def is_ipv4(str_value: str) -> bool:
 
     :param str_value: String to evaluate.
     """
-    return str_value.lower() in ("ipv4", "ipv4if")
+    return str_value.lower() in _IPV4_VALUES
 
 
 def is_ipv6(str_value: str) -> bool:
@@ -53,7 +74,7 @@ def is_ipv6(str_value: str) -> bool:
 
     :param str_value: String to evaluate.
     """
-    return str_value.lower() in ("ipv6", "ipv6if")
+    return str_value.lower() in _IPV6_VALUES
 
 
 def is_ip(str_value: str) -> bool:
@@ -61,27 +82,53 @@ def is_ip(str_value: str) -> bool:
 
     :param str str_value: String to evaluate.
     """
-    return is_ipv4(str_value) or is_ipv6(str_value)
+    return str_value.lower() in _IP_VALUES
+
+
+def _handler_file_name(handler: logging.Handler) -> Optional[str]:
+    """Return the name of the file the handler (or its buffering target) writes to, if any."""
+    return getattr(getattr(handler, "target", handler), "baseFilename", None)
 
 
-def new_log_file(logger: logging.Logger, suffix: str, file_type: str = "tcl") -> logging.Logger:
+def new_log_file(logger: logging.Logger, suffix: str, file_type: str = "tcl", capacity: int = 1024) -> logging.Logger:
     """Create new logger and log file from existing logger.
 
     The new logger will be create in the same directory as the existing logger file and will be named as the existing
     log file with the requested suffix.
+    Records are buffered in memory and written to the file every capacity records, on error and on exit.
 
     :param logger: existing logger
     :param suffix: string to add to the existing log file name to create the new log file name.
     :param file_type: logger file type (tcl. txt. etc.)
+    :param capacity: number of records to buffer before writing them to the file, 0 to write each record immediately.
     """
-    file_handler = None
-    for handler in logger.handlers:
-        if isinstance(handler, logging.FileHandler):
-            file_handler = handler
+    file_handler = next((h for h in reversed(logger.handlers) if isinstance(h, logging.FileHandler)), None)
     new_logger = logging.getLogger(file_type + suffix)
     if file_handler:
         logger_file_name = path.splitext(file_handler.baseFilename)[0]
         tcl_logger_file_name = logger_file_name + "-" + suffix + "." + file_type
-        new_logger.addHandler(logging.FileHandler(tcl_logger_file_name, "w"))
+        # Loggers are global, so do not add another handler to the same file if the new logger was already created.
+        if not any(_handler_file_name(h) == tcl_logger_file_name for h in new_logger.handlers):
+            handler: logging.Handler = logging.FileHandler(tcl_logger_file_name, "w")
+            if capacity:
+                handler = MemoryHandler(capacity, flushLevel=logging.ERROR, target=handler)
+            new_logger.addHandler(handler)
         new_logger.setLevel(logger.getEffectiveLevel())
     return new_logger
+
+
+def poll(timeout: float, delay: float = 0.1, max_delay: float = 2.0) -> Iterator[None]:
+    """Yield until timeout expires, sleeping with exponential backoff between iterations.
+
+    :param timeout: Total time to poll in seconds.
+    :param delay: Initial delay between iterations in seconds.
+    :param max_delay: Maximum delay between iterations in seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        yield
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 1.5, max_delay)
@@ -2,16 +2,22 @@
 TrafficGenerator VMWare client classes and utilities.
 """
 import logging
+import re
+import threading
 import time
-from ipaddress import AddressValueError, IPv4Network
-from typing import Dict
+from contextlib import ExitStack, suppress
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from weakref import WeakValueDictionary
 
+from pyVmomi import vim, vmodl
 from vmwc import Snapshot, VirtualMachine, VMWareClient
 
 from trafficgenerator import TgnError
 
 logger = logging.getLogger("tgn.trafficgenerator")
 
+IPV4_ADDRESS = re.compile(r"(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})")
+
 
 class TgnVMWareClientException(TgnError):
     """Base (default) class for all TrafficGenerator VMWare client exceptions."""
@@ -20,7 +26,8 @@ class TgnVMWareClientException(TgnError):
 class VMWare(VMWareClient):
     """TrafficGenerator VMWare client."""
 
-    clients: Dict[str, "VMWare"] = {}
+    clients: "WeakValueDictionary[str, VMWare]" = WeakValueDictionary()
+    _clients_lock = threading.Lock()
 
     def __init__(self, host: str, username: str, password: str) -> None:
         """Initialize variables and get all user VMs from VMWare.
@@ -33,54 +40,132 @@ class VMWare(VMWareClient):
         self.host = host
         self.username = username
         self.password = password
+        self._client: Optional[VMWareClient] = None
+        self._tgn_session = ExitStack()
+        self._vms_by_name: Optional[Dict[str, vim.VirtualMachine]] = None
+        self._lock = threading.Lock()
+
+    def __del__(self) -> None:
+        """Logout the session, if open."""
+        with suppress(Exception):
+            self._disconnect()
 
     @staticmethod
     def get_client(host: str, username: str, password: str) -> "VMWare":
-        """Return VMWare client for the requested host."""
-        if host not in VMWare.clients:
-            VMWare.clients[host] = VMWare(host, username, password)
-        return VMWare.clients[host]
+        """Return VMWare client for the requested host.
+
+        Clients are shared while referenced and dropped from the registry once no one holds them.
+        """
+        with VMWare._clients_lock:
+            client = VMWare.clients.get(host)
+            if client is None:
+                client = VMWare(host, username, password)
+                VMWare.clients[host] = client
+            return client
 
     def power_on(self, ip_or_name: str, wait_on: bool = True, wait_vmware_tools: bool = False) -> None:
         """Power on specific machine."""
-        with VMWareClient(self.host, self.username, self.password) as client:
+
+        def operation(client: VMWareClient) -> None:
             vm = self._get_vm(client, ip_or_name)
             self._power_on(vm, wait_on)
             if wait_vmware_tools:
                 self._wait_vmware_tools(vm)
 
+        self._run(operation)
+
     def power_off(self, ip_or_name: str, wait_off: bool = True) -> None:
         """Power off specific machine."""
-        with VMWareClient(self.host, self.username, self.password) as client:
-            vm = self._get_vm(client, ip_or_name)
-            self._power_off(vm, wait_off)
+        self._run(lambda client: self._power_off(self._get_vm(client, ip_or_name), wait_off))
+
+    def close(self) -> None:
+        """Logout the session, if open. The next operation will login again."""
+        with self._lock:
+            self._disconnect()
+
+    def _run(self, operation: Callable[[VMWareClient], Any]) -> Any:
+        """Run operation within the long-lived client session.
+
+        The session is validated (and renewed if expired) before the operation starts. The operation itself is never
+        retried, as it might have changed the VM state (e.g. sent power on) before failing.
+        """
+        with self._lock:
+            return operation(self._connect())
+
+    def _connect(self) -> VMWareClient:
+        """Return logged in client, logging in again if there is no session or the session expired."""
+        if self._client and not self._is_alive(self._client):
+            self._disconnect()
+        if not self._client:
+            self._client = self._tgn_session.enter_context(VMWareClient(self.host, self.username, self.password))
+        return self._client
+
+    def _disconnect(self) -> None:
+        self._client = None
+        self._vms_by_name = None
+        with suppress(vim.fault.NotAuthenticated, ConnectionError):
+            self._tgn_session.close()
+
+    @staticmethod
+    def _is_alive(client: VMWareClient) -> bool:
+        """Return True if the client session is still logged in."""
+        try:
+            return client._content.sessionManager.currentSession is not None  # pylint: disable=protected-access
+        except (vim.fault.NotAuthenticated, ConnectionError):
+            return False
 
     #
-    # Private methods that assume VMWareClient is initialized (run within "with VMWareClient" clause).
+    # Private methods that assume VMWareClient is initialized (run within "with VMWareClient" clause or _run).
     #
 
     def _get_vm(self, client: VMWareClient, ip_or_name: str) -> VirtualMachine:
         """Get VM by IP or name."""
-        try:
-            IPv4Network(ip_or_name)
+        match = IPV4_ADDRESS.fullmatch(ip_or_name)
+        if match and all(int(octet) <= 255 for octet in match.groups()):
             return self._get_vm_by_ip(client, ip_or_name)
-        except AddressValueError:
-            return self._get_vm_by_name(client, ip_or_name)
+        return self._get_vm_by_name(client, ip_or_name)
 
     @staticmethod
     def _get_vm_by_ip(client: VMWareClient, ip: str) -> VirtualMachine:
-        for vm in client.get_virtual_machines():
-            if vm.get_tools_status():
-                for net in vm._raw_virtual_machine.guest.net:  # pylint: disable=protected-access
+        search_index = client._content.searchIndex  # pylint: disable=protected-access
+        raw_vm = search_index.FindByIp(datacenter=None, ip=ip, vmSearch=True)
+        if raw_vm:
+            return VirtualMachine(client, raw_vm)
+        # The search index matches the guest primary IP only, scan all guest NICs.
+        for raw_vm, properties in _retrieve_vms_properties(client, ["guest.toolsStatus", "guest.net"]):
+            if properties.get("guest.toolsStatus"):
+                for net in properties.get("guest.net", []):
                     if ip in net.ipAddress:
-                        return vm
+                        return VirtualMachine(client, raw_vm)
         raise TgnVMWareClientException(f"VM with IP {ip} not found")
 
-    @staticmethod
-    def _get_vm_by_name(client: VMWareClient, name: str) -> VirtualMachine:
-        for vm in client.get_virtual_machines():
-            if vm.name == name:
-                return vm
+    def _get_vm_by_name(self, client: VMWareClient, name: str) -> VirtualMachine:
+        """Get VM by name.
+
+        Within the long-lived session, the first scan of the inventory is cached so following lookups are dictionary
+        lookups. Cached VMs are validated on use and the inventory is rescanned if they went stale.
+        """
+        vms_by_name = self._vms_by_name if client is self._client else None
+        if vms_by_name is None:
+            search_index = client._content.searchIndex  # pylint: disable=protected-access
+            raw_vm = search_index.FindByDnsName(datacenter=None, dnsName=name, vmSearch=True)
+            if raw_vm:
+                vm = VirtualMachine(client, raw_vm)
+                if vm.name == name:
+                    return vm
+        elif name in vms_by_name:
+            try:
+                vm = VirtualMachine(client, vms_by_name[name])
+                if vm.name == name:
+                    return vm
+            except vmodl.fault.ManagedObjectNotFound:
+                pass
+        # The search index matches the guest host name, which may differ from the VM name.
+        vms_by_name = {properties.get("name"): raw_vm for raw_vm, properties in _retrieve_vms_properties(client, ["name"])}
+        if client is self._client:
+            self._vms_by_name = vms_by_name
+        if name in vms_by_name:
+            return VirtualMachine(client, vms_by_name[name])
         raise TgnVMWareClientException(f"VM with name {name} not found")
 
     @staticmethod
@@ -106,28 +191,90 @@ class VMWare(VMWareClient):
     def _wait_on(vm: VirtualMachine, timeout: int = 30) -> None:
         """Wait for VM to power on."""
         logger.info(f"Waiting for {vm.name} to power on")
-        for _ in range(timeout):
-            if vm.is_powered_on():
-                return
-            time.sleep(1)
-        raise TgnVMWareClientException(f"VM {vm.name} not on after {timeout} seconds")
+        if not _wait_for_vm_property(vm, "runtime.powerState", lambda state: state == "poweredOn", timeout):
+            raise TgnVMWareClientException(f"VM {vm.name} not on after {timeout} seconds")
 
     @staticmethod
     def _wait_off(vm: VirtualMachine, timeout: int = 30) -> None:
         """Wait for VM to power off."""
         logger.info(f"Waiting for {vm.name} to power off")
-        for _ in range(timeout):
-            if not vm.is_powered_on():
-                return
-            time.sleep(1)
-        raise TgnVMWareClientException(f"VM {vm.name} not off after {timeout} seconds")
+        if not _wait_for_vm_property(vm, "runtime.powerState", lambda state: state != "poweredOn", timeout):
+            raise TgnVMWareClientException(f"VM {vm.name} not off after {timeout} seconds")
 
     @staticmethod
     def _wait_vmware_tools(vm: VirtualMachine, timeout: int = 30) -> None:
         """Wait for VM IP to be discovered by VMWare."""
         logger.info(f"Waiting for {vm.name} VMWare tools to be discovered")
-        for _ in range(timeout):
-            if vm.get_tools_status():
-                return
-            time.sleep(1)
-        raise TgnVMWareClientException(f"Can't find {vm.name} VMWare tools after {timeout} seconds")
+        if not _wait_for_vm_property(vm, "guest.toolsStatus", bool, timeout):
+            raise TgnVMWareClientException(f"Can't find {vm.name} VMWare tools after {timeout} seconds")
+
+
+def _retrieve_vms_properties(client: VMWareClient, path_set: List[str]) -> Iterator[Tuple[vim.VirtualMachine, Dict[str, Any]]]:
+    """Yield all VMs with the requested properties, retrieved in batches by a single property collector query.
+
+    Accessing VM properties through the VirtualMachine wrapper costs a round-trip per property per VM, the property
+    collector returns the properties of up to 1000 VMs per round-trip.
+
+    :param client: Initialized VMWare client (run within "with VMWareClient" clause).
+    :param path_set: Properties to retrieve.
+    """
+    content = client._content  # pylint: disable=protected-access
+    collector = content.propertyCollector
+    view = content.viewManager.CreateContainerView(content.rootFolder, [vim.VirtualMachine], True)
+    traversal_spec = vmodl.query.PropertyCollector.TraversalSpec(
+        name="view", path="view", skip=False, type=vim.view.ContainerView
+    )
+    object_spec = vmodl.query.PropertyCollector.ObjectSpec(obj=view, skip=True, selectSet=[traversal_spec])
+    property_spec = vmodl.query.PropertyCollector.PropertySpec(type=vim.VirtualMachine, pathSet=path_set)
+    filter_spec = vmodl.query.PropertyCollector.FilterSpec(objectSet=[object_spec], propSet=[property_spec])
+    result = None
+    try:
+        result = collector.RetrievePropertiesEx([filter_spec], vmodl.query.PropertyCollector.RetrieveOptions(maxObjects=1000))
+        while result:
+            for object_content in result.objects:
+                yield object_content.obj, {prop.name: prop.val for prop in object_content.propSet}
+            result = collector.ContinueRetrievePropertiesEx(result.token) if result.token else None
+    finally:
+        if result and result.token:
+            collector.CancelRetrievePropertiesEx(result.token)
+        view.Destroy()
+
+
+def _wait_for_vm_property(vm: VirtualMachine, path: str, condition: Callable[[Any], bool], timeout: int) -> bool:
+    """Wait for VM property to meet condition, return True if it did and False on timeout.
+
+    Instead of polling the property, wait for vCenter to push property updates so the wait returns as soon as the
+    property changes.
+
+    :param vm: VM to wait on.
+    :param path: Property path to wait on.
+    :param condition: Callable that returns True if the property value meets the condition.
+    :param timeout: Seconds to wait.
+    """
+    object_spec = vmodl.query.PropertyCollector.ObjectSpec(obj=vm._raw_virtual_machine)  # pylint: disable=protected-access
+    property_spec = vmodl.query.PropertyCollector.PropertySpec(type=vim.VirtualMachine, pathSet=[path])
+    filter_spec = vmodl.query.PropertyCollector.FilterSpec(objectSet=[object_spec], propSet=[property_spec])
+    collector = vm._client._content.propertyCollector.CreatePropertyCollector()  # pylint: disable=protected-access
+    try:
+        collector.CreateFilter(filter_spec, True)
+        deadline = time.monotonic() + timeout
+        version = ""
+        while time.monotonic() < deadline:
+            wait_options = vmodl.query.PropertyCollector.WaitOptions(maxWaitSeconds=max(int(deadline - time.monotonic()), 1))
+            update = collector.WaitForUpdatesEx(version, wait_options)
+            if not update:
+                continue
+            version = update.version
+            if any(name == path and condition(val) for name, val in _iter_changes(update)):
+                return True
+        return False
+    finally:
+        collector.Destroy()
+
+
+def _iter_changes(update: vmodl.query.PropertyCollector.UpdateSet) -> Iterator[Tuple[str, Any]]:
+    """Yield (property name, value) of all property changes in a property collector update set."""
+    for filter_update in update.filterSet:
+        for object_update in filter_update.objectSet:
+            for change in object_update.changeSet:
+                yield change.name, change.val